@@ -2,6 +2,7 @@
 
 import click
 import json
+import sqlite3
 import sys
 from datetime import datetime
 from typing import Optional
@@ -10,6 +11,9 @@ from queuectl.storage import JobStorage
 from queuectl.worker import WorkerManager
 from queuectl.config import get_config, set_config, load_config
 
+# Job states in lifecycle order
+STATES = ("pending", "processing", "completed", "failed", "dead")
+
 
 @click.group()
 def cli():
@@ -18,14 +22,56 @@ def cli():
 
 
 @cli.command()
-@click.argument("job_json", type=str)
-def enqueue(job_json: str):
+@click.argument("job_json", type=str, required=False)
+@click.option("--id", "opt_id", help="Job ID (instead of JOB_JSON)")
+@click.option("--command", "opt_command", help="Command to run (instead of JOB_JSON)")
+@click.option("--max-retries", "opt_max_retries", type=int, help="Max retries (defaults to config)")
+def enqueue(job_json: Optional[str], opt_id: Optional[str], opt_command: Optional[str],
+            opt_max_retries: Optional[int]):
     """Enqueue a new job to the queue
     
     Example: queuectl enqueue '{"id":"job1","command":"sleep 2"}'
+    
+    Or without JSON: queuectl enqueue --id job1 --command "sleep 2"
+    
+    A JSON array of jobs is enqueued in a single transaction.
     """
     try:
-        job_data = json.loads(job_json)
+        if job_json is None:
+            # Flag form: no JSON to parse
+            job_data = {"id": opt_id, "command": opt_command}
+            if opt_max_retries is not None:
+                job_data["max_retries"] = opt_max_retries
+        elif opt_id or opt_command or opt_max_retries is not None:
+            click.echo("Error: Pass either JOB_JSON or --id/--command/--max-retries, not both", err=True)
+            sys.exit(1)
+        else:
+            job_data = json.loads(job_json)
+        
+        if isinstance(job_data, list):
+            default_retries = get_config("max_retries", 3)
+            jobs = []
+            for item in job_data:
+                if not isinstance(item, dict):
+                    click.echo("Error: Every job in the array must be a JSON object", err=True)
+                    sys.exit(1)
+                if not item.get("id") or not item.get("command"):
+                    click.echo("Error: 'id' and 'command' are required fields for every job", err=True)
+                    sys.exit(1)
+                jobs.append((item["id"], item["command"], item.get("max_retries", default_retries)))
+            
+            try:
+                count = JobStorage().create_jobs(jobs)
+            except sqlite3.IntegrityError:
+                click.echo("Error: One or more jobs already exist, nothing was enqueued", err=True)
+                sys.exit(1)
+            click.echo(f"{count} job(s) enqueued successfully")
+            return
+        
+        if not isinstance(job_data, dict):
+            click.echo("Error: JOB_JSON must be a JSON object or an array of objects", err=True)
+            sys.exit(1)
+        
         job_id = job_data.get("id")
         command = job_data.get("command")
         max_retries = job_data.get("max_retries", get_config("max_retries", 3))
@@ -71,6 +117,7 @@ def start(count: int):
     
     manager = WorkerManager()
     manager.start_workers(count)
+    manager.wait_for_workers()
 
 
 @worker.command()
@@ -86,27 +133,26 @@ def status():
     storage = JobStorage()
     manager = WorkerManager()
     
-    stats = storage.get_stats()
+    stats, total = storage.get_stats_with_total()
     active_workers = manager.get_active_workers()
     
-    click.echo("=== Queue Status ===")
-    click.echo(f"Active Workers: {active_workers}")
-    click.echo("\nJob States:")
-    
-    states = ["pending", "processing", "completed", "failed", "dead"]
-    for state in states:
-        count = stats.get(state, 0)
-        click.echo(f"  {state.capitalize():12}: {count}")
-    
-    total = sum(stats.values())
-    click.echo(f"\nTotal Jobs: {total}")
-
-
-@cli.command()
-@click.option("--state", type=click.Choice(["pending", "processing", "completed", "failed", "dead"]), 
+    # Build the report first and write it with a single echo
+    lines = [
+        "=== Queue Status ===",
+        f"Active Workers: {active_workers}",
+        "\nJob States:",
+    ]
+    for state in STATES:
+        lines.append(f"  {state.capitalize():12}: {stats.get(state, 0)}")
+    lines.append(f"\nTotal Jobs: {total}")
+    click.echo("\n".join(lines))
+
+
+@cli.command("list")
+@click.option("--state", type=click.Choice(STATES), 
               help="Filter jobs by state")
 @click.option("--limit", default=20, type=int, help="Maximum number of jobs to display")
-def list(state: Optional[str], limit: int):
+def list_jobs(state: Optional[str], limit: int):
     """List jobs, optionally filtered by state"""
     storage = JobStorage()
     jobs = storage.list_jobs(state=state, limit=limit)
@@ -227,19 +273,11 @@ def config_set(key: str, value: str):
     # Normalize key: convert hyphens to underscores
     key = key.replace("-", "_")
     
-    # Try to convert value to appropriate type
+    # Parse JSON scalars/containers (numbers, true/false, null, lists); otherwise keep as string
     try:
-        # Try integer
-        if value.isdigit() or (value.startswith('-') and value[1:].isdigit()):
-            value = int(value)
-        # Try float
-        elif '.' in value and value.replace('.', '').replace('-', '').isdigit():
-            value = float(value)
-        # Try boolean
-        elif value.lower() in ('true', 'false'):
-            value = value.lower() == 'true'
-    except:
-        pass  # Keep as string
+        value = json.loads(value)
+    except json.JSONDecodeError:
+        pass
     
     set_config(key, value)
     click.echo(f"Set {key} = {value}")
@@ -12,39 +12,65 @@ DEFAULT_CONFIG = {
     "backoff_base": 2,
     "db_path": str(CONFIG_DIR / "jobs.db"),
     "worker_pid_file": str(CONFIG_DIR / "workers.pid"),
+    # Jobs a worker claims per database round trip; >1 helps short jobs but can leave
+    # other workers idle while one works through its batch
+    "worker_batch_size": 1,
+    # Pin workers round-robin to the CPUs the process may use (Linux only) so each
+    # worker's SQLite pages stay in one core's cache
+    "worker_pin_cpu": False,
 }
 
+# Parsed config cached by the config file's (inode, mtime, size); (0, 0, 0) when it is missing
+_CACHE: Dict[str, Any] = {"key": None, "config": None}
+
 
 def ensure_config_dir():
     """Ensure configuration directory exists"""
     CONFIG_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def _cached_config() -> Dict[str, Any]:
+    """Return the parsed config, re-reading the file only when it changes"""
+    try:
+        st = CONFIG_FILE.stat()
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        key = (0, 0, 0)
+    
+    if key != _CACHE["key"]:
+        ensure_config_dir()
+        config = DEFAULT_CONFIG.copy()
+        if key[0]:
+            try:
+                with open(CONFIG_FILE, "r") as f:
+                    config.update(json.load(f))
+            except Exception:
+                # Unreadable file: fall back to defaults, but don't cache them
+                return DEFAULT_CONFIG.copy()
+        _CACHE["config"] = config
+        _CACHE["key"] = key
+    return _CACHE["config"]
+
+
 def load_config() -> Dict[str, Any]:
     """Load configuration from file or return defaults"""
-    ensure_config_dir()
-    if CONFIG_FILE.exists():
-        try:
-            with open(CONFIG_FILE, "r") as f:
-                user_config = json.load(f)
-                config = {**DEFAULT_CONFIG, **user_config}
-                return config
-        except Exception:
-            return DEFAULT_CONFIG.copy()
-    return DEFAULT_CONFIG.copy()
+    return _cached_config().copy()
 
 
 def save_config(config: Dict[str, Any]):
-    """Save configuration to file"""
+    """Save configuration to file atomically"""
     ensure_config_dir()
-    with open(CONFIG_FILE, "w") as f:
+    # Write a temp file and rename it over the config so readers never see it half-written
+    tmp_file = CONFIG_FILE.with_name(CONFIG_FILE.name + ".tmp")
+    with open(tmp_file, "w") as f:
         json.dump(config, f, indent=2)
+    os.replace(tmp_file, CONFIG_FILE)
+    _CACHE["key"] = None
 
 
 def get_config(key: str, default=None):
     """Get a specific configuration value"""
-    config = load_config()
-    return config.get(key, default)
+    return _cached_config().get(key, default)
 
 
 def set_config(key: str, value: Any):
@@ -1,16 +1,47 @@
 """Job model and execution logic"""
 
+import functools
 import subprocess
 import signal
+import shlex
+import shutil
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, Optional
 from queuectl.config import get_config
 
+# UTC timestamps are stored as fixed-width strings so they compare correctly in SQL
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+# Characters that need /bin/sh to interpret (pipes, redirects, expansion, globbing, ...)
+_SHELL_CHARS = frozenset("|&;<>()$`*?[]{}~!#\n")
+
+
+def utcnow_iso() -> str:
+    """Current UTC time formatted as a job timestamp"""
+    return datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+
+@functools.lru_cache(maxsize=256)
+def _find_executable(name: str, path: Optional[str]) -> Optional[str]:
+    """Resolve a program on PATH, memoized so repeated jobs skip the directory scan"""
+    return shutil.which(name, path=path)
+
+
+@functools.lru_cache(maxsize=64)
+def _backoff_delay(base, attempts: int) -> timedelta:
+    """Exponential backoff delay (base ** attempts seconds), memoized per (base, attempts)"""
+    return timedelta(seconds=base ** attempts)
+
 
 class Job:
     """Represents a job in the queue"""
     
+    __slots__ = (
+        "id", "command", "state", "attempts", "max_retries", "next_retry_at",
+        "created_at", "updated_at", "completed_at", "error_message",
+    )
+    
     def __init__(self, data: Dict[str, Any]):
         self.id = data["id"]
         self.command = data["command"]
@@ -44,51 +75,67 @@ class Job:
         Returns: (success, error_message)
         """
         try:
-            # Determine shell based on OS
-            shell = os.name == 'nt'  # Windows uses cmd, Unix uses /bin/sh
-            
-            if timeout:
-                result = subprocess.run(
-                    self.command,
-                    shell=True,
-                    capture_output=True,
-                    text=True,
-                    timeout=timeout,
-                    check=False
-                )
+            argv = None if self._needs_shell() else shlex.split(self.command)
+            # An absolute executable path lets subprocess use posix_spawn instead of fork+exec
+            executable = _find_executable(argv[0], os.environ.get("PATH")) if argv else None
+            if executable:
+                result = self._run(argv, shell=False, timeout=timeout, executable=executable)
             else:
-                result = subprocess.run(
-                    self.command,
-                    shell=True,
-                    capture_output=True,
-                    text=True,
-                    check=False
-                )
+                # Shell syntax, or not an executable on PATH (e.g. a shell builtin)
+                result = self._run(self.command, shell=True, timeout=timeout)
             
             if result.returncode == 0:
                 return True, None
             else:
-                error_msg = result.stderr or result.stdout or f"Command failed with exit code {result.returncode}"
+                error_msg = result.stderr or f"Command failed with exit code {result.returncode}"
                 return False, error_msg
         except subprocess.TimeoutExpired:
             return False, f"Command timed out after {timeout} seconds"
         except FileNotFoundError:
+            _find_executable.cache_clear()  # The cached path may have been removed
             return False, f"Command not found: {self.command}"
         except Exception as e:
             return False, str(e)
     
+    def _needs_shell(self) -> bool:
+        """Check if the command uses shell syntax and must run via the shell"""
+        if os.name == 'nt':
+            return True  # Windows builtins (echo, dir, ...) only exist in cmd
+        words = self.command.split(None, 1)
+        # An empty command or a leading VAR=value assignment is also shell syntax
+        return not words or "=" in words[0] or any(c in _SHELL_CHARS for c in self.command)
+    
+    @staticmethod
+    def _run(args, shell: bool, timeout: Optional[int],
+             executable: Optional[str] = None) -> subprocess.CompletedProcess:
+        """Run the command, capturing stderr only (stdout is never reported)
+        
+        close_fds=False is safe because Python and SQLite open their descriptors
+        close-on-exec, and it keeps subprocess on its posix_spawn fast path.
+        """
+        return subprocess.run(
+            args,
+            executable=executable,
+            shell=shell,
+            close_fds=False,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=timeout,
+            check=False
+        )
+    
     def calculate_next_retry(self) -> str:
         """Calculate next retry time using exponential backoff"""
-        backoff_base = get_config("backoff_base", 2)
-        delay_seconds = backoff_base ** self.attempts
-        next_retry = datetime.utcnow() + timedelta(seconds=delay_seconds)
-        return next_retry.isoformat() + "Z"
+        delay = _backoff_delay(get_config("backoff_base", 2), self.attempts)
+        next_retry = datetime.now(timezone.utc) + delay
+        return next_retry.strftime(TIMESTAMP_FORMAT)
     
     def should_retry(self) -> bool:
         """Check if job should be retried"""
         return self.attempts < self.max_retries
     
-    def mark_for_retry(self) -> Dict[str, Any]:
+    def mark_for_retry(self):
         """Prepare job for retry with exponential backoff"""
         self.attempts += 1
         if self.should_retry():
@@ -97,16 +144,14 @@ class Job:
         else:
             self.state = "dead"
             self.next_retry_at = None
-        return self.to_dict()
     
-    def mark_completed(self) -> Dict[str, Any]:
+    def mark_completed(self):
         """Mark job as completed"""
         self.state = "completed"
-        self.completed_at = datetime.utcnow().isoformat() + "Z"
-        return self.to_dict()
+        self.completed_at = utcnow_iso()
     
-    def mark_failed(self, error_message: str) -> Dict[str, Any]:
+    def mark_failed(self, error_message: str):
         """Mark job as failed"""
         self.error_message = error_message
-        return self.mark_for_retry()
+        self.mark_for_retry()
 
@@ -0,0 +1,92 @@
+"""Wake-up notifications from job producers to idle workers
+
+Producers write one byte per new job into a named pipe next to the database
+(`<db_path>.notify`), so every process using the same database shares it whatever
+its config dir; idle workers block on the pipe (with a timeout) instead of sleeping
+a fixed interval. On platforms without named pipes this degrades to plain timed sleeps.
+"""
+
+import os
+import select
+import time
+from pathlib import Path
+from typing import Optional
+
+# Upper bound on wake-up bytes written per call; a pipe holds at least 512 bytes
+MAX_TOKENS = 512
+
+
+def notify_path(db_path: str) -> Path:
+    """Path of the wake-up pipe shared by everything using the database at `db_path`"""
+    return Path(str(db_path) + ".notify")
+
+
+def notify_workers(db_path: str, count: int = 1):
+    """Wake up to `count` idle workers; a no-op when no worker is listening"""
+    if not hasattr(os, "mkfifo") or count < 1:
+        return
+    try:
+        fd = os.open(notify_path(db_path), os.O_WRONLY | os.O_NONBLOCK)
+    except OSError:
+        return  # FIFO not created yet, or no worker has it open
+    try:
+        os.write(fd, b"\x01" * min(count, MAX_TOKENS))
+    except OSError:
+        pass  # Pipe full: workers already have wake-ups queued
+    finally:
+        os.close(fd)
+
+
+class WorkerNotifier:
+    """Worker side of the notification pipe"""
+    
+    def __init__(self, db_path: str):
+        self._read_fd: Optional[int] = None
+        self._write_fd: Optional[int] = None
+        if not hasattr(os, "mkfifo"):
+            return
+        
+        fifo = notify_path(db_path)
+        try:
+            os.mkfifo(fifo)
+            # Anyone who can write the database may wake its workers
+            os.chmod(fifo, os.stat(db_path).st_mode & 0o666)
+        except FileExistsError:
+            pass
+        self._read_fd = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+        # Keep a write end open so the pipe never reads as EOF once producers close theirs
+        self._write_fd = os.open(fifo, os.O_WRONLY | os.O_NONBLOCK)
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether producers can wake this worker (False where named pipes are unavailable)"""
+        return self._read_fd is not None
+    
+    def wait(self, timeout: float):
+        """Block until a producer signals new work or `timeout` seconds pass"""
+        if self._read_fd is None:
+            time.sleep(timeout)
+            return
+        
+        ready, _, _ = select.select([self._read_fd], [], [], timeout)
+        if ready:
+            try:
+                os.read(self._read_fd, 1)  # One token per wake-up, leaving the rest for other workers
+            except BlockingIOError:
+                pass  # Another worker took the token first
+    
+    def drain(self) -> int:
+        """Discard queued wake-ups (left by enqueues while every worker was busy); return how many"""
+        if self._read_fd is None:
+            return 0
+        try:
+            return len(os.read(self._read_fd, MAX_TOKENS))
+        except BlockingIOError:
+            return 0
+    
+    def close(self):
+        """Close the pipe file descriptors"""
+        for fd in (self._read_fd, self._write_fd):
+            if fd is not None:
+                os.close(fd)
+        self._read_fd = self._write_fd = None
@@ -2,140 +2,264 @@
 
 import sqlite3
 import json
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 import threading
+from datetime import datetime, timedelta, timezone
 
 from queuectl.config import get_config
+from queuectl.job import utcnow_iso, TIMESTAMP_FORMAT
+from queuectl.notify import notify_workers
+
+# UPDATE/INSERT ... RETURNING needs SQLite 3.35+
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
 
 
 class JobStorage:
-    """Thread-safe job storage using SQLite"""
+    """Thread-safe job storage using SQLite
+    
+    Each thread gets its own connection; writes are serialized by SQLite's own
+    locking, which also covers separate worker processes. Connections are never
+    shared across fork: each worker builds its own JobStorage after starting.
+    """
+    
+    # Database paths whose schema has already been created in this process
+    _initialized_paths = set()
+    
+    # Fixed SQL text lets sqlite3's per-connection statement cache reuse the prepared statements
+    _SQL_LIST_ALL = "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?"
+    _SQL_LIST_BY_STATE = "SELECT * FROM jobs WHERE state = ? ORDER BY created_at DESC LIMIT ?"
+    _SQL_FINALIZE = """
+        UPDATE jobs
+        SET state = ?, attempts = ?, next_retry_at = ?, completed_at = ?, error_message = ?, updated_at = ?
+        WHERE id = ?
+    """
     
     def __init__(self, db_path: Optional[str] = None):
         self.db_path = db_path or get_config("db_path")
-        self._lock = threading.Lock()
-        self._init_db()
+        self._tls = threading.local()
+        if self.db_path not in JobStorage._initialized_paths:
+            self._init_db()
+            JobStorage._initialized_paths.add(self.db_path)
     
     def _init_db(self):
         """Initialize database schema"""
-        with self._lock:
-            conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS jobs (
-                    id TEXT PRIMARY KEY,
-                    command TEXT NOT NULL,
-                    state TEXT NOT NULL,
-                    attempts INTEGER NOT NULL DEFAULT 0,
-                    max_retries INTEGER NOT NULL DEFAULT 3,
-                    next_retry_at TEXT,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL,
-                    completed_at TEXT,
-                    error_message TEXT
-                )
-            """)
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_state ON jobs(state)
-            """)
-            conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_next_retry ON jobs(next_retry_at)
-            """)
-            conn.commit()
-            conn.close()
+        conn = self._get_connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                command TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_retries INTEGER NOT NULL DEFAULT 3,
+                next_retry_at TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                completed_at TEXT,
+                error_message TEXT
+            )
+        """)
+        # idx_ready covers the ready-job polling query; it subsumes the old idx_state
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ready ON jobs(state, next_retry_at, created_at)
+        """)
+        conn.execute("""
+            DROP INDEX IF EXISTS idx_state
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_next_retry ON jobs(next_retry_at)
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_created_at ON jobs(created_at DESC)
+        """)
     
     def _get_connection(self):
-        """Get a database connection with row factory"""
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        conn.row_factory = sqlite3.Row
+        """Get this thread's cached database connection, opening it on first use"""
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            # Wait for other processes' write locks instead of failing with "database is locked"
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            # Serve reads from a memory map of the file instead of read() copies
+            conn.execute("PRAGMA mmap_size=268435456")
+            self._tls.conn = conn
         return conn
     
+    def _fetch_dicts(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        """Run a query and return rows as dicts built from plain tuples
+        
+        Skips sqlite3.Row, whose per-key lookups make dict(row) quadratic in column count.
+        """
+        cursor = self._get_connection().cursor()
+        cursor.row_factory = None
+        cursor.execute(sql, params)
+        names = [col[0] for col in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+    
+    def _write_returning(self, job_id: str, sql: str, params) -> Optional[Dict[str, Any]]:
+        """Run a single-job INSERT/UPDATE and return the job's row afterwards
+        
+        Uses RETURNING * where supported so the row comes back without a second SELECT.
+        """
+        conn = self._get_connection()
+        if HAS_RETURNING:
+            cursor = conn.execute(sql + " RETURNING *", params)
+            row = cursor.fetchone()
+            cursor.close()
+            if row:
+                return dict(row)
+        else:
+            conn.execute(sql, params)
+        return self.get_job(job_id)
+    
     def create_job(self, job_id: str, command: str, max_retries: int = 3) -> Dict[str, Any]:
         """Create a new job"""
-        now = datetime.utcnow().isoformat() + "Z"
-        with self._lock:
-            conn = self._get_connection()
-            conn.execute("""
+        now = utcnow_iso()
+        job = self._write_returning(job_id, """
+            INSERT INTO jobs (id, command, state, attempts, max_retries, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (job_id, command, "pending", 0, max_retries, now, now))
+        notify_workers(self.db_path)
+        return job
+    
+    def create_jobs(self, jobs: List[Tuple[str, str, int]]) -> int:
+        """Create many jobs from (id, command, max_retries) tuples in a single transaction
+        
+        Raises sqlite3.IntegrityError (and creates nothing) if any ID already exists.
+        """
+        # Ready jobs are ordered by created_at, so step it by 1us per row to keep batch order
+        start = datetime.now(timezone.utc)
+        rows = []
+        for i, (job_id, command, max_retries) in enumerate(jobs):
+            created = (start + timedelta(microseconds=i)).strftime(TIMESTAMP_FORMAT)
+            rows.append((job_id, command, "pending", 0, max_retries, created, created))
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("""
                 INSERT INTO jobs (id, command, state, attempts, max_retries, created_at, updated_at)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (job_id, command, "pending", 0, max_retries, now, now))
-            conn.commit()
-            conn.close()
-        return self.get_job(job_id)
+            """, rows)
+        except BaseException:
+            # Also on KeyboardInterrupt/SystemExit: this cached connection must not stay mid-transaction
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        notify_workers(self.db_path, len(rows))
+        return len(rows)
     
     def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Get a job by ID"""
         conn = self._get_connection()
         cursor = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
         row = cursor.fetchone()
-        conn.close()
         if row:
             return dict(row)
         return None
     
     def update_job(self, job_id: str, **updates) -> Optional[Dict[str, Any]]:
         """Update job fields"""
-        updates["updated_at"] = datetime.utcnow().isoformat() + "Z"
+        updates["updated_at"] = utcnow_iso()
         set_clause = ", ".join([f"{k} = ?" for k in updates.keys()])
         values = list(updates.values()) + [job_id]
         
-        with self._lock:
-            conn = self._get_connection()
-            conn.execute(f"UPDATE jobs SET {set_clause} WHERE id = ?", values)
-            conn.commit()
-            conn.close()
-        return self.get_job(job_id)
+        return self._write_returning(job_id, f"UPDATE jobs SET {set_clause} WHERE id = ?", values)
+    
+    def finalize_job(self, job_id: str, *, state: str, attempts: int,
+                     next_retry_at: Optional[str] = None, completed_at: Optional[str] = None,
+                     error_message: Optional[str] = None):
+        """Record the outcome of a job run, writing only the columns a run can change"""
+        conn = self._get_connection()
+        conn.execute(self._SQL_FINALIZE, (
+            state, attempts, next_retry_at, completed_at, error_message, utcnow_iso(), job_id
+        ))
+        if state == "failed":
+            # Idle workers may be sleeping past this retry's due time; wake one to recompute
+            notify_workers(self.db_path)
     
     def get_pending_jobs(self, limit: int = 1) -> List[Dict[str, Any]]:
         """Get pending jobs that are ready to be processed (including failed jobs ready to retry)"""
-        now = datetime.utcnow().isoformat() + "Z"
-        conn = self._get_connection()
-        cursor = conn.execute("""
+        now = utcnow_iso()
+        return self._fetch_dicts("""
             SELECT * FROM jobs 
-            WHERE (state = 'pending' OR state = 'failed')
-            AND (next_retry_at IS NULL OR next_retry_at <= ?)
+            WHERE state IN ('pending', 'failed')
+            AND COALESCE(next_retry_at, '') <= ?
             ORDER BY created_at ASC
             LIMIT ?
         """, (now, limit))
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
     
     def acquire_job(self, job_id: str) -> bool:
         """Try to acquire a job for processing (lock it)"""
-        now = datetime.utcnow().isoformat() + "Z"
-        with self._lock:
-            conn = self._get_connection()
-            # Acquire jobs that are pending or failed (ready to retry)
-            cursor = conn.execute(
-                """UPDATE jobs SET state = 'processing' 
-                   WHERE id = ? 
-                   AND (state = 'pending' OR state = 'failed')
-                   AND (next_retry_at IS NULL OR next_retry_at <= ?)""",
-                (job_id, now)
+        now = utcnow_iso()
+        conn = self._get_connection()
+        # Acquire jobs that are pending or failed (ready to retry)
+        cursor = conn.execute(
+            """UPDATE jobs SET state = 'processing' 
+               WHERE id = ? 
+               AND state IN ('pending', 'failed')
+               AND COALESCE(next_retry_at, '') <= ?""",
+            (job_id, now)
+        )
+        success = cursor.rowcount > 0
+        return success
+    
+    def claim_jobs(self, limit: int) -> List[Dict[str, Any]]:
+        """Atomically claim up to `limit` ready jobs, oldest first"""
+        if not HAS_RETURNING:
+            claimed = []
+            for job in self.get_pending_jobs(limit=limit):
+                if self.acquire_job(job["id"]):
+                    claimed.append(self.get_job(job["id"]))
+            return claimed
+        
+        now = utcnow_iso()
+        jobs = self._fetch_dicts("""
+            UPDATE jobs SET state = 'processing', updated_at = ?
+            WHERE id IN (
+                SELECT id FROM jobs
+                WHERE state IN ('pending', 'failed')
+                AND COALESCE(next_retry_at, '') <= ?
+                ORDER BY created_at ASC
+                LIMIT ?
             )
-            conn.commit()
-            success = cursor.rowcount > 0
-            conn.close()
-            return success
+            RETURNING *
+        """, (now, now, limit))
+        # RETURNING does not guarantee row order
+        jobs.sort(key=lambda job: job["created_at"])
+        return jobs
+    
+    def seconds_until_next_retry(self) -> Optional[float]:
+        """Seconds until the earliest scheduled retry is due, or None if none is scheduled"""
+        conn = self._get_connection()
+        next_retry_at = conn.execute(
+            "SELECT MIN(next_retry_at) FROM jobs WHERE state = 'failed'"
+        ).fetchone()[0]
+        if next_retry_at is None:
+            return None
+        # Lenient parse: rows from older versions may lack the fractional seconds
+        due = datetime.fromisoformat(next_retry_at.replace("Z", "+00:00"))
+        if due.tzinfo is None:
+            due = due.replace(tzinfo=timezone.utc)
+        return max(0.0, (due - datetime.now(timezone.utc)).total_seconds())
+    
+    def release_jobs(self, job_ids: List[str]):
+        """Put claimed jobs that were never started back in the queue"""
+        conn = self._get_connection()
+        conn.executemany(
+            "UPDATE jobs SET state = 'pending', updated_at = ? WHERE id = ? AND state = 'processing'",
+            [(utcnow_iso(), job_id) for job_id in job_ids]
+        )
+        notify_workers(self.db_path, len(job_ids))
     
     def list_jobs(self, state: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
         """List jobs optionally filtered by state"""
-        conn = self._get_connection()
         if state:
-            cursor = conn.execute(
-                "SELECT * FROM jobs WHERE state = ? ORDER BY created_at DESC LIMIT ?",
-                (state, limit)
-            )
-        else:
-            cursor = conn.execute(
-                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?",
-                (limit,)
-            )
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+            return self._fetch_dicts(self._SQL_LIST_BY_STATE, (state, limit))
+        return self._fetch_dicts(self._SQL_LIST_ALL, (limit,))
     
     def get_dlq_jobs(self) -> List[Dict[str, Any]]:
         """Get all jobs in Dead Letter Queue"""
@@ -143,30 +267,35 @@ class JobStorage:
     
     def get_stats(self) -> Dict[str, int]:
         """Get job statistics"""
+        return self.get_stats_with_total()[0]
+    
+    def get_stats_with_total(self) -> Tuple[Dict[str, int], int]:
+        """Get job statistics and the total job count in a single query"""
         conn = self._get_connection()
         cursor = conn.execute("""
             SELECT state, COUNT(*) as count 
             FROM jobs 
             GROUP BY state
         """)
-        stats = {row["state"]: row["count"] for row in cursor.fetchall()}
-        conn.close()
-        return stats
+        stats = {}
+        total = 0
+        for row in cursor:
+            stats[row["state"]] = row["count"]
+            total += row["count"]
+        return stats, total
     
     def reset_job_for_retry(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Reset a DLQ job for retry"""
-        with self._lock:
-            conn = self._get_connection()
-            conn.execute("""
-                UPDATE jobs 
-                SET state = 'pending', 
-                    attempts = 0, 
-                    next_retry_at = NULL,
-                    error_message = NULL,
-                    updated_at = ?
-                WHERE id = ? AND state = 'dead'
-            """, (datetime.utcnow().isoformat() + "Z", job_id))
-            conn.commit()
-            conn.close()
-        return self.get_job(job_id)
+        job = self._write_returning(job_id, """
+            UPDATE jobs 
+            SET state = 'pending', 
+                attempts = 0, 
+                next_retry_at = NULL,
+                error_message = NULL,
+                updated_at = ?
+            WHERE id = ? AND state = 'dead'
+        """, (utcnow_iso(), job_id))
+        if job and job["state"] == "pending":
+            notify_workers(self.db_path)
+        return job
 
@@ -3,16 +3,34 @@
 from flask import Flask, render_template, jsonify, request
 import json
 import os
+import sqlite3
 from pathlib import Path
 from queuectl.storage import JobStorage
 from queuectl.worker import WorkerManager
 from queuectl.config import get_config, set_config, load_config
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Get the directory where this file is located
 BASE_DIR = Path(__file__).parent
 TEMPLATE_DIR = BASE_DIR / 'templates'
 
 app = Flask(__name__, template_folder=str(TEMPLATE_DIR))
+app.json.sort_keys = False
+
+# Shared across requests so schema setup and connections aren't redone per request
+storage = JobStorage()
+worker_manager = WorkerManager()
+
+
+def _json_response(obj):
+    """Serialize obj as a JSON response, using orjson when it is installed"""
+    if orjson is None:
+        return jsonify(obj)
+    return app.response_class(orjson.dumps(obj), mimetype='application/json')
 
 
 @app.route('/')
@@ -24,13 +42,10 @@ def index():
 @app.route('/api/status')
 def api_status():
     """Get queue status"""
-    storage = JobStorage()
-    manager = WorkerManager()
+    stats, total = storage.get_stats_with_total()
+    active_workers = worker_manager.get_active_workers()
     
-    stats = storage.get_stats()
-    active_workers = manager.get_active_workers()
-    
-    return jsonify({
+    return _json_response({
         'active_workers': active_workers,
         'stats': {
             'pending': stats.get('pending', 0),
@@ -39,87 +54,101 @@ def api_status():
             'failed': stats.get('failed', 0),
             'dead': stats.get('dead', 0),
         },
-        'total': sum(stats.values())
+        'total': total
     })
 
 
 @app.route('/api/jobs')
 def api_jobs():
     """Get jobs list"""
-    storage = JobStorage()
     state = request.args.get('state')
     limit = request.args.get('limit', 100, type=int)
     
     jobs = storage.list_jobs(state=state, limit=limit)
-    return jsonify({'jobs': jobs})
+    return _json_response({'jobs': jobs})
 
 
 @app.route('/api/job/<job_id>')
 def api_job(job_id):
     """Get specific job details"""
-    storage = JobStorage()
     job = storage.get_job(job_id)
     
     if not job:
-        return jsonify({'error': 'Job not found'}), 404
+        return _json_response({'error': 'Job not found'}), 404
     
-    return jsonify({'job': job})
+    return _json_response({'job': job})
 
 
 @app.route('/api/dlq')
 def api_dlq():
     """Get DLQ jobs"""
-    storage = JobStorage()
     jobs = storage.get_dlq_jobs()
-    return jsonify({'jobs': jobs})
+    return _json_response({'jobs': jobs})
 
 
 @app.route('/api/dlq/<job_id>/retry', methods=['POST'])
 def api_dlq_retry(job_id):
     """Retry a job from DLQ"""
-    storage = JobStorage()
     job = storage.get_job(job_id)
     
     if not job:
-        return jsonify({'error': 'Job not found'}), 404
+        return _json_response({'error': 'Job not found'}), 404
     
     if job['state'] != 'dead':
-        return jsonify({'error': f"Job is not in DLQ (state: {job['state']})"}), 400
+        return _json_response({'error': f"Job is not in DLQ (state: {job['state']})"}), 400
     
     updated_job = storage.reset_job_for_retry(job_id)
     if updated_job:
-        return jsonify({'success': True, 'job': updated_job})
+        return _json_response({'success': True, 'job': updated_job})
     else:
-        return jsonify({'error': 'Failed to reset job'}), 500
+        return _json_response({'error': 'Failed to reset job'}), 500
 
 
 @app.route('/api/enqueue', methods=['POST'])
 def api_enqueue():
-    """Enqueue a new job"""
-    data = request.get_json()
+    """Enqueue a new job, or a batch of jobs posted as {'jobs': [...]}"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return _json_response({'error': 'Request body must be a JSON object'}), 400
+    
+    if 'jobs' in data:
+        if not isinstance(data['jobs'], list):
+            return _json_response({'error': "'jobs' must be a list of job objects"}), 400
+        default_retries = get_config('max_retries', 3)
+        jobs = []
+        for item in data['jobs']:
+            if not isinstance(item, dict):
+                return _json_response({'error': "Every entry in 'jobs' must be a job object"}), 400
+            if not item.get('id') or not item.get('command'):
+                return _json_response({'error': "'id' and 'command' are required for every job"}), 400
+            jobs.append((item['id'], item['command'], item.get('max_retries', default_retries)))
+        
+        try:
+            count = storage.create_jobs(jobs)
+        except sqlite3.IntegrityError:
+            return _json_response({'error': 'One or more jobs already exist'}), 400
+        return _json_response({'success': True, 'count': count})
     
     job_id = data.get('id')
     command = data.get('command')
     max_retries = data.get('max_retries', get_config('max_retries', 3))
     
     if not job_id or not command:
-        return jsonify({'error': "'id' and 'command' are required"}), 400
-    
-    storage = JobStorage()
+        return _json_response({'error': "'id' and 'command' are required"}), 400
     
     # Check if job already exists
     if storage.get_job(job_id):
-        return jsonify({'error': f"Job '{job_id}' already exists"}), 400
+        return _json_response({'error': f"Job '{job_id}' already exists"}), 400
     
     job = storage.create_job(job_id, command, max_retries)
-    return jsonify({'success': True, 'job': job})
+    return _json_response({'success': True, 'job': job})
 
 
 @app.route('/api/config')
 def api_config():
     """Get configuration"""
     config = load_config()
-    return jsonify({'config': config})
+    return _json_response({'config': config})
 
 
 @app.route('/api/config', methods=['POST'])
@@ -130,19 +159,31 @@ def api_config_set():
     value = data.get('value')
     
     if not key:
-        return jsonify({'error': "'key' is required"}), 400
+        return _json_response({'error': "'key' is required"}), 400
     
     # Normalize key
     key = key.replace('-', '_')
     
     set_config(key, value)
-    return jsonify({'success': True, 'key': key, 'value': value})
+    return _json_response({'success': True, 'key': key, 'value': value})
 
 
 def run_web_ui(host='127.0.0.1', port=5000, debug=False):
-    """Run the web UI server"""
+    """Run the web UI server
+    
+    Uses waitress (multi-threaded) when installed, except in debug mode where the
+    Flask development server is kept for its reloader and debugger.
+    """
     print(f"Starting queuectl Web UI at http://{host}:{port}")
     print(f"Open your browser and navigate to http://{host}:{port}")
+    if not debug:
+        try:
+            from waitress import serve
+        except ImportError:
+            pass
+        else:
+            serve(app, host=host, port=port, threads=8)
+            return
     app.run(host=host, port=port, debug=debug)
 
 
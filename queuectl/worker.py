@@ -3,17 +3,153 @@
 import os
 import sys
 import time
+import random
+import select
 import signal
+import struct
+import threading
 import multiprocessing
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 import json
+import logging
+import logging.handlers
+from collections import deque
 
 from queuectl.storage import JobStorage
 from queuectl.job import Job
+from queuectl.notify import WorkerNotifier
 from queuectl.config import get_config, CONFIG_DIR
 
 
+class _StderrHandler(logging.StreamHandler):
+    """StreamHandler that writes to the current sys.stderr, so later redirects still apply"""
+    
+    @property
+    def stream(self):
+        return sys.stderr
+    
+    @stream.setter
+    def stream(self, value):
+        pass  # Always resolved at emit time
+
+
+logger = logging.getLogger("queuectl.worker")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_stderr_handler = _StderrHandler()
+_stderr_handler.setFormatter(logging.Formatter("%(message)s"))
+logger.addHandler(_stderr_handler)
+
+
+class _BufferedStderrHandler(logging.handlers.BufferingHandler):
+    """Buffers log records and writes them to stderr with a single write per flush
+    
+    Flushes when the buffer is full, on an ERROR record, and from a background thread
+    every `flush_interval` seconds, so lines never lag behind a long-running job.
+    """
+    
+    def __init__(self, capacity: int, flush_interval: float = 1.0):
+        super().__init__(capacity)
+        self.setFormatter(logging.Formatter("%(message)s"))
+        self._flush_interval = flush_interval
+        threading.Thread(target=self._flush_periodically, daemon=True).start()
+    
+    def _flush_periodically(self):
+        """Bound how long a record can sit in the buffer while the worker is busy"""
+        while True:
+            time.sleep(self._flush_interval)
+            self.flush()
+    
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        return super().shouldFlush(record) or record.levelno >= logging.ERROR
+    
+    def flush(self):
+        self.acquire()
+        try:
+            if self.buffer:
+                sys.stderr.write("".join(self.format(record) + "\n" for record in self.buffer))
+                sys.stderr.flush()
+                self.buffer.clear()
+        finally:
+            self.release()
+
+
+# Idle wait bounds: enqueues wake workers through the notify pipe, so the timeout mainly
+# catches the next scheduled retry (or polls, where the pipe is unavailable). The cap stays
+# short as a fallback for producers whose wake-up doesn't get through.
+IDLE_POLL_INTERVAL = 1.0
+IDLE_WAIT_MAX = 5.0
+IDLE_WAIT_MIN = 0.05
+
+# Backoff after a loop error (seconds): doubles per consecutive error, plus random
+# jitter so workers hit by the same transient failure don't retry in lockstep
+ERROR_BACKOFF_MIN = 0.1
+ERROR_BACKOFF_MAX = 5.0
+ERROR_BACKOFF_JITTER = 0.25
+
+# Leading bytes of the binary PID file; anything else is read as the old JSON format
+PID_FILE_MAGIC = b"QPID\x01"
+
+# Seconds get_active_workers() reuses its last count for an unchanged PID file
+ACTIVE_WORKERS_TTL = 1.0
+
+# Fork on POSIX: children inherit the already-imported modules instead of re-importing
+# them as spawn does (the default on macOS). Windows only supports spawn.
+if sys.platform != "win32":
+    _mp_context = multiprocessing.get_context("fork")
+else:
+    _mp_context = multiprocessing.get_context()
+
+
+def _is_running(pid: int) -> bool:
+    """Check if a process exists (signal 0 probes without signalling)"""
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, but owned by another user
+
+
+def _idle_timeout(storage: JobStorage, notifier: WorkerNotifier) -> float:
+    """How long an idle worker may block before it must look for ready jobs again"""
+    if not notifier.enabled:
+        return IDLE_POLL_INTERVAL
+    delay = storage.seconds_until_next_retry()
+    if delay is None:
+        return IDLE_WAIT_MAX
+    return min(max(delay, IDLE_WAIT_MIN), IDLE_WAIT_MAX)
+
+
+def _run_job(storage: JobStorage, job_data: dict, worker_id: int):
+    """Execute one claimed job and record its outcome"""
+    job_id = job_data["id"]
+    job = Job(job_data)
+    success, error_msg = job.execute()
+    
+    if success:
+        job.mark_completed()
+    else:
+        job.mark_failed(error_msg)
+    storage.finalize_job(
+        job_id,
+        state=job.state,
+        attempts=job.attempts,
+        next_retry_at=job.next_retry_at,
+        completed_at=job.completed_at,
+        error_message=job.error_message,
+    )
+    
+    if success:
+        logger.info(f"Worker {worker_id}: Job {job_id} completed")
+    elif job.state == "dead":
+        logger.info(f"Worker {worker_id}: Job {job_id} moved to DLQ after {job.attempts} attempts")
+    else:
+        logger.info(f"Worker {worker_id}: Job {job_id} failed, will retry (attempt {job.attempts}/{job.max_retries})")
+
+
 class WorkerManager:
     """Manages worker processes"""
     
@@ -21,70 +157,90 @@ class WorkerManager:
         self.pid_file = Path(get_config("worker_pid_file"))
         self.workers: list[multiprocessing.Process] = []
         self.running = False
+        # (PID file mtime, parsed PIDs) from the last _read_pids()
+        self._pid_cache: Optional[Tuple[int, List[int]]] = None
+        # (PID file mtime, monotonic time, active count) from the last get_active_workers()
+        self._active_cache: Optional[Tuple[int, float, int]] = None
     
-    def _worker_process(self, worker_id: int):
+    @staticmethod
+    def _worker_process(worker_id: int):
         """Main worker process loop"""
+        # Opened after the fork so this worker has its own SQLite connection
         storage = JobStorage()
-        print(f"Worker {worker_id} started (PID: {os.getpid()})", file=sys.stderr)
+        notifier = WorkerNotifier(storage.db_path)
+        
+        # Per-job log lines are batched in the worker; the parent keeps the unbuffered handler
+        log_buffer = _BufferedStderrHandler(capacity=256)
+        logger.removeHandler(_stderr_handler)
+        logger.addHandler(log_buffer)
+        logger.info(f"Worker {worker_id} started (PID: {os.getpid()})")
         
         def signal_handler(sig, frame):
-            print(f"Worker {worker_id} received shutdown signal", file=sys.stderr)
+            logger.info(f"Worker {worker_id} received shutdown signal")
             sys.exit(0)
         
         signal.signal(signal.SIGTERM, signal_handler)
         signal.signal(signal.SIGINT, signal_handler)
         
-        while True:
+        if get_config("worker_pin_cpu", False) and hasattr(os, "sched_setaffinity"):
+            # Pick from the CPUs this process may use (cgroup cpusets, taskset), not all of them
+            allowed = sorted(os.sched_getaffinity(0))
+            cpu = allowed[(worker_id - 1) % len(allowed)]
             try:
-                # Get pending jobs
-                pending_jobs = storage.get_pending_jobs(limit=1)
-                
-                if not pending_jobs:
-                    time.sleep(1)  # No jobs, wait a bit
-                    continue
-                
-                job_data = pending_jobs[0]
-                job_id = job_data["id"]
-                
-                # Try to acquire the job
-                if not storage.acquire_job(job_id):
-                    time.sleep(0.5)  # Job already taken, try again
-                    continue
-                
-                # Process the job
-                job = Job(job_data)
-                success, error_msg = job.execute()
-                
-                if success:
-                    job.mark_completed()
-                    storage.update_job(job_id, **job.to_dict())
-                    print(f"Worker {worker_id}: Job {job_id} completed", file=sys.stderr)
-                else:
-                    job.mark_failed(error_msg)
-                    storage.update_job(job_id, **job.to_dict())
+                os.sched_setaffinity(0, {cpu})
+            except OSError as e:
+                logger.warning(f"Worker {worker_id} could not pin to CPU {cpu}: {e}")
+        
+        batch_size = max(1, get_config("worker_batch_size", 1))
+        claimed = deque()
+        backoff = ERROR_BACKOFF_MIN
+        
+        try:
+            while True:
+                try:
+                    if not claimed:
+                        # Claim the next ready job(s) (select + lock in one statement)
+                        claimed.extend(storage.claim_jobs(batch_size))
+                        if not claimed and notifier.drain():
+                            # Stale wake-ups would each cost an empty claim; one that arrived
+                            # after the claim above may be for a new job, so look once more
+                            claimed.extend(storage.claim_jobs(batch_size))
+                        backoff = ERROR_BACKOFF_MIN
                     
-                    if job.state == "dead":
-                        print(f"Worker {worker_id}: Job {job_id} moved to DLQ after {job.attempts} attempts", file=sys.stderr)
-                    else:
-                        print(f"Worker {worker_id}: Job {job_id} failed, will retry (attempt {job.attempts}/{job.max_retries})", file=sys.stderr)
-                
-            except KeyboardInterrupt:
-                break
-            except Exception as e:
-                print(f"Worker {worker_id} error: {e}", file=sys.stderr)
-                time.sleep(1)
+                    if not claimed:
+                        # No jobs: sleep until an enqueue wakes us or the next retry is due
+                        log_buffer.flush()
+                        notifier.wait(_idle_timeout(storage, notifier))
+                        continue
+                    
+                    _run_job(storage, claimed.popleft(), worker_id)
+                    
+                except KeyboardInterrupt:
+                    break
+                except Exception as e:
+                    logger.error(f"Worker {worker_id} error: {e}")
+                    time.sleep(backoff + random.random() * ERROR_BACKOFF_JITTER)
+                    backoff = min(ERROR_BACKOFF_MAX, backoff * 2)
+        finally:
+            # Hand claimed-but-unstarted jobs back to the queue on shutdown
+            if claimed:
+                storage.release_jobs([job["id"] for job in claimed])
+            log_buffer.flush()
     
     def start_workers(self, count: int = 1):
         """Start worker processes"""
         if self.running:
-            print("Workers are already running", file=sys.stderr)
+            logger.info("Workers are already running")
             return
         
         self.running = True
         self.workers = []
         
+        # Create the schema once here so forked workers skip it
+        JobStorage()
+        
         for i in range(count):
-            process = multiprocessing.Process(
+            process = _mp_context.Process(
                 target=self._worker_process,
                 args=(i + 1,),
                 daemon=False
@@ -93,92 +249,205 @@ class WorkerManager:
             self.workers.append(process)
         
         # Save worker PIDs
-        pids = [p.pid for p in self.workers]
-        self.pid_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.pid_file, "w") as f:
-            json.dump({"pids": pids, "count": count}, f)
+        self._write_pids([p.pid for p in self.workers])
         
-        print(f"Started {count} worker(s)", file=sys.stderr)
+        logger.info(f"Started {count} worker(s)")
         for i, worker in enumerate(self.workers):
-            print(f"  Worker {i+1}: PID {worker.pid}", file=sys.stderr)
+            logger.info(f"  Worker {i+1}: PID {worker.pid}")
+    
+    def wait_for_workers(self):
+        """Block until the started workers exit; SIGINT/SIGTERM stops them gracefully first"""
+        def signal_handler(sig, frame):
+            self._stop_started_workers()
+            sys.exit(0)
+        
+        signal.signal(signal.SIGTERM, signal_handler)
+        signal.signal(signal.SIGINT, signal_handler)
+        for process in self.workers:
+            process.join()
     
     def stop_workers(self):
         """Stop all worker processes gracefully"""
-        if not self.pid_file.exists():
-            print("No workers are running", file=sys.stderr)
+        try:
+            pids = self._read_pids()
+        except FileNotFoundError:
+            logger.info("No workers are running")
+            return
+        except (ValueError, struct.error) as e:
+            logger.error(f"Error stopping workers: unreadable PID file {self.pid_file}: {e}")
             return
         
         try:
-            with open(self.pid_file, "r") as f:
-                data = json.load(f)
-                pids = data.get("pids", [])
-            
             if not pids:
-                print("No worker PIDs found", file=sys.stderr)
+                logger.info("No worker PIDs found")
                 return
             
-            print(f"Stopping {len(pids)} worker(s)...", file=sys.stderr)
+            logger.info(f"Stopping {len(pids)} worker(s)...")
             
             # Send SIGTERM to all workers
             for pid in pids:
                 try:
                     os.kill(pid, signal.SIGTERM)
-                    print(f"Sent termination signal to PID {pid}", file=sys.stderr)
+                    logger.info(f"Sent termination signal to PID {pid}")
                 except ProcessLookupError:
-                    print(f"PID {pid} not found (already stopped)", file=sys.stderr)
+                    logger.info(f"PID {pid} not found (already stopped)")
                 except Exception as e:
-                    print(f"Error stopping PID {pid}: {e}", file=sys.stderr)
+                    logger.error(f"Error stopping PID {pid}: {e}")
             
-            # Wait for processes to finish (with timeout)
-            import time
-            timeout = 10
-            start_time = time.time()
-            
-            for pid in pids[:]:  # Copy list
+            # Wait for processes to finish (with timeout), then force the stragglers
+            for pid in self._wait_for_exit(pids, timeout=10):
+                logger.warning(f"Timeout waiting for PID {pid}, forcing termination")
                 try:
-                    while True:
-                        os.kill(pid, 0)  # Check if process exists
-                        if time.time() - start_time > timeout:
-                            print(f"Timeout waiting for PID {pid}, forcing termination", file=sys.stderr)
-                            try:
-                                os.kill(pid, signal.SIGKILL)
-                            except:
-                                pass
-                            break
-                        time.sleep(0.5)
-                except ProcessLookupError:
-                    pass  # Process already stopped
+                    os.kill(pid, signal.SIGKILL)
+                except OSError:
+                    pass
             
             # Clean up PID file
             if self.pid_file.exists():
                 self.pid_file.unlink()
             
             self.running = False
-            print("All workers stopped", file=sys.stderr)
+            logger.info("All workers stopped")
             
         except Exception as e:
-            print(f"Error stopping workers: {e}", file=sys.stderr)
+            logger.error(f"Error stopping workers: {e}")
     
-    def get_active_workers(self) -> int:
-        """Get count of active workers"""
-        if not self.pid_file.exists():
-            return 0
+    def _stop_started_workers(self):
+        """Stop the workers this manager started, leaving other sessions' workers alone"""
+        alive = [p for p in self.workers if p.is_alive()]
+        if alive:
+            logger.info(f"Stopping {len(alive)} worker(s)...")
+        for process in alive:
+            process.terminate()
+        
+        # Our own children are reaped with waitpid (join) as they exit
+        for pid in self._join_children(alive, timeout=10):
+            logger.warning(f"Timeout waiting for PID {pid}, forcing termination")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+        for process in alive:
+            process.join(1)  # Reap killed children so they don't linger as zombies
         
+        # Another `worker start` may have replaced the PID file since; only remove our own
+        try:
+            if set(self._read_pids()) == {p.pid for p in self.workers}:
+                self.pid_file.unlink()
+        except (FileNotFoundError, ValueError, struct.error):
+            pass
+        
+        self.running = False
+        logger.info("All workers stopped")
+    
+    def _write_pids(self, pids: List[int]):
+        """Atomically replace the PID file so readers never see a partial write
+        
+        Format: PID_FILE_MAGIC, then a native-endian uint32 count and that many int32 PIDs.
+        """
+        self.pid_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.pid_file.with_name(self.pid_file.name + ".tmp")
+        with open(tmp_file, "wb") as f:
+            f.write(PID_FILE_MAGIC + struct.pack(f"=I{len(pids)}i", len(pids), *pids))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.pid_file)
+    
+    def _read_pids(self) -> List[int]:
+        """Read worker PIDs, reusing the last parse while the PID file's mtime is unchanged
+        
+        Raises FileNotFoundError when no PID file exists, and ValueError (or struct.error)
+        when it can't be parsed.
+        """
+        mtime = self.pid_file.stat().st_mtime_ns
+        if self._pid_cache is None or self._pid_cache[0] != mtime:
+            data = self.pid_file.read_bytes()
+            if data.startswith(PID_FILE_MAGIC):
+                offset = len(PID_FILE_MAGIC)
+                count, = struct.unpack_from("=I", data, offset)
+                pids = list(struct.unpack_from(f"={count}i", data, offset + 4))
+            else:
+                # JSON PID file written by an older queuectl
+                legacy = json.loads(data)
+                if not isinstance(legacy, dict) or "pids" not in legacy:
+                    raise ValueError(f"Unrecognized PID file format: {self.pid_file}")
+                pids = legacy["pids"]
+            self._pid_cache = (mtime, pids)
+        return self._pid_cache[1]
+    
+    @staticmethod
+    def _join_children(processes: List[multiprocessing.Process], timeout: float) -> List[int]:
+        """Reap child workers as they exit (join waits in waitpid); return the PIDs still running"""
+        deadline = time.monotonic() + timeout
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+        return [p.pid for p in processes if p.is_alive()]
+    
+    @staticmethod
+    def _wait_for_exit(pids: List[int], timeout: float) -> List[int]:
+        """Wait up to `timeout` seconds for processes to exit; return the PIDs still running"""
+        if hasattr(os, "pidfd_open"):
+            try:
+                return WorkerManager._wait_for_exit_pidfd(pids, timeout)
+            except OSError:
+                pass  # Kernel without pidfd_open (Linux < 5.3)
+        return WorkerManager._wait_for_exit_polling(pids, timeout)
+    
+    @staticmethod
+    def _wait_for_exit_pidfd(pids: List[int], timeout: float) -> List[int]:
+        """Block on pidfds, waking as soon as each process exits"""
+        poller = select.poll()
+        pidfds = {}
         try:
-            with open(self.pid_file, "r") as f:
-                data = json.load(f)
-                pids = data.get("pids", [])
-            
-            # Check which PIDs are still alive
-            active = 0
             for pid in pids:
                 try:
-                    os.kill(pid, 0)  # Signal 0 checks if process exists
-                    active += 1
+                    fd = os.pidfd_open(pid)
                 except ProcessLookupError:
-                    pass
+                    continue  # Already stopped
+                pidfds[fd] = pid
+                poller.register(fd, select.POLLIN)
             
-            return active
+            deadline = time.monotonic() + timeout
+            while pidfds:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                for fd, _ in poller.poll(remaining * 1000):
+                    poller.unregister(fd)
+                    os.close(fd)
+                    del pidfds[fd]
+            return list(pidfds.values())
+        finally:
+            for fd in pidfds:
+                os.close(fd)
+    
+    @staticmethod
+    def _wait_for_exit_polling(pids: List[int], timeout: float) -> List[int]:
+        """Probe processes with signal 0 every 0.5s until they exit"""
+        deadline = time.monotonic() + timeout
+        running = [pid for pid in pids if _is_running(pid)]
+        while running and time.monotonic() < deadline:
+            time.sleep(0.5)
+            running = [pid for pid in running if _is_running(pid)]
+        return running
+    
+    def get_active_workers(self) -> int:
+        """Get count of active workers
+        
+        The count is cached for ACTIVE_WORKERS_TTL seconds while the PID file is unchanged,
+        so frequent callers (the web dashboard) don't probe every PID on each poll.
+        """
+        try:
+            pids = self._read_pids()
         except Exception:
-            return 0
-
+            return 0  # No PID file (or unreadable)
+        
+        mtime = self._pid_cache[0]
+        now = time.monotonic()
+        cached = self._active_cache
+        if cached and cached[0] == mtime and now - cached[1] < ACTIVE_WORKERS_TTL:
+            return cached[2]
+        
+        active = sum(1 for pid in pids if _is_running(pid))
+        self._active_cache = (mtime, now, active)
+        return active
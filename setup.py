@@ -11,6 +11,9 @@ setup(
         "sqlalchemy>=2.0.23",
         "flask>=3.0.0",
     ],
+    extras_require={
+        "fast": ["orjson>=3.9", "waitress>=2.1"],
+    },
     entry_points={
         "console_scripts": [
             "queuectl=queuectl.cli:main",
@@ -2,36 +2,44 @@
 """Helper script to start the web UI and open it in browser"""
 
 import webbrowser
+import socket
 import time
 import subprocess
 import sys
-from threading import Timer
+import threading
 
-def open_browser(url):
-    """Open browser after a short delay"""
-    time.sleep(2)  # Wait for server to start
+def open_browser(host, port, url, timeout=5.0):
+    """Open browser as soon as the server accepts connections"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.05).close()
+            break
+        except OSError:
+            time.sleep(0.025)
     print(f"\n{'='*60}")
     print(f"Opening browser at: {url}")
     print(f"{'='*60}\n")
     webbrowser.open(url)
 
 if __name__ == "__main__":
-    url = "http://127.0.0.1:5000"
+    host, port = "127.0.0.1", 5000
+    url = f"http://{host}:{port}"
     
     print("=" * 60)
     print("Starting queuectl Web UI...")
     print("=" * 60)
     print(f"\nServer will start at: {url}")
-    print("Browser will open automatically in 2 seconds...")
+    print("Browser will open automatically once it is up...")
     print("\nPress Ctrl+C to stop the server\n")
     
-    # Open browser in background thread
-    Timer(2.0, open_browser, args=(url,)).start()
+    # Open browser in background thread once the server is listening
+    threading.Thread(target=open_browser, args=(host, port, url), daemon=True).start()
     
     # Start the web server
     try:
         from queuectl.web import run_web_ui
-        run_web_ui(host='127.0.0.1', port=5000, debug=False)
+        run_web_ui(host=host, port=port, debug=False)
     except KeyboardInterrupt:
         print("\n\nServer stopped.")
     except Exception as e:
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """Validation script to test core queuectl functionality"""
 
+import contextlib
+import io
 import subprocess
 import time
 import json
@@ -11,27 +13,29 @@ from pathlib import Path
 # Add queuectl to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from queuectl.cli import cli
 from queuectl.storage import JobStorage
 from queuectl.config import CONFIG_DIR
 
-def run_command(cmd: list, capture_output=True):
-    """Run a command and return result"""
+def run_command(args: list):
+    """Run a queuectl CLI command in-process and return (success, stdout, stderr)"""
+    stdout, stderr = io.StringIO(), io.StringIO()
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=capture_output,
-            text=True,
-            timeout=30
-        )
-        return result.returncode == 0, result.stdout, result.stderr
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            cli.main(args, prog_name="queuectl", standalone_mode=False)
+        success = True
+    except SystemExit as e:
+        success = not e.code
     except Exception as e:
-        return False, "", str(e)
+        stderr.write(str(e))
+        success = False
+    return success, stdout.getvalue(), stderr.getvalue()
 
 def test_enqueue():
     """Test 1: Basic job enqueuing"""
     print("\n=== Test 1: Enqueue Job ===")
     cmd = [
-        sys.executable, "-m", "queuectl.cli", "enqueue",
+        "enqueue",
         '{"id":"test1","command":"echo hello"}'
     ]
     success, stdout, stderr = run_command(cmd)
@@ -45,7 +49,7 @@ def test_enqueue():
 def test_status():
     """Test 2: Status command"""
     print("\n=== Test 2: Status Command ===")
-    cmd = [sys.executable, "-m", "queuectl.cli", "status"]
+    cmd = ["status"]
     success, stdout, stderr = run_command(cmd)
     if success:
         print("✅ Status command works")
@@ -61,7 +65,7 @@ def test_worker_completion():
     
     # Enqueue a simple job
     cmd = [
-        sys.executable, "-m", "queuectl.cli", "enqueue",
+        "enqueue",
         '{"id":"test3","command":"echo success"}'
     ]
     run_command(cmd)
@@ -81,11 +85,11 @@ def test_worker_completion():
         print("✅ Job completed successfully")
         
         # Stop worker
-        run_command([sys.executable, "-m", "queuectl.cli", "worker", "stop"])
+        run_command(["worker", "stop"])
         return True
     else:
         print(f"❌ Job not completed. State: {job['state'] if job else 'not found'}")
-        run_command([sys.executable, "-m", "queuectl.cli", "worker", "stop"])
+        run_command(["worker", "stop"])
         return False
 
 def test_retry_and_dlq():
@@ -94,12 +98,12 @@ def test_retry_and_dlq():
     
     # Set max retries to 2 for faster testing
     run_command([
-        sys.executable, "-m", "queuectl.cli", "config", "set", "max_retries", "2"
+        "config", "set", "max_retries", "2"
     ])
     
     # Enqueue a job that will fail
     cmd = [
-        sys.executable, "-m", "queuectl.cli", "enqueue",
+        "enqueue",
         '{"id":"test4","command":"nonexistentcommand12345"}'
     ]
     run_command(cmd)
@@ -121,17 +125,17 @@ def test_retry_and_dlq():
         
         # Test DLQ list
         success, stdout, _ = run_command([
-            sys.executable, "-m", "queuectl.cli", "dlq", "list"
+            "dlq", "list"
         ])
         if success and "test4" in stdout:
             print("✅ DLQ list command works")
         
         # Stop worker
-        run_command([sys.executable, "-m", "queuectl.cli", "worker", "stop"])
+        run_command(["worker", "stop"])
         return True
     else:
         print(f"❌ Job not in DLQ. State: {job['state'] if job else 'not found'}")
-        run_command([sys.executable, "-m", "queuectl.cli", "worker", "stop"])
+        run_command(["worker", "stop"])
         return False
 
 def test_persistence():
@@ -140,7 +144,7 @@ def test_persistence():
     
     # Enqueue a job
     cmd = [
-        sys.executable, "-m", "queuectl.cli", "enqueue",
+        "enqueue",
         '{"id":"test5","command":"echo persistent"}'
     ]
     run_command(cmd)
@@ -169,7 +173,7 @@ def test_list_jobs():
     print("\n=== Test 6: List Jobs ===")
     
     success, stdout, _ = run_command([
-        sys.executable, "-m", "queuectl.cli", "list", "--state", "completed"
+        "list", "--state", "completed"
     ])
     
     if success:
@@ -185,12 +189,12 @@ def test_config():
     
     # Set a config value
     success1, _, _ = run_command([
-        sys.executable, "-m", "queuectl.cli", "config", "set", "max-retries", "5"
+        "config", "set", "max-retries", "5"
     ])
     
     # Get config value
     success2, stdout, _ = run_command([
-        sys.executable, "-m", "queuectl.cli", "config", "get", "max_retries"
+        "config", "get", "max_retries"
     ])
     
     if success1 and success2 and "5" in stdout:
@@ -200,31 +204,87 @@ def test_config():
         print("❌ Configuration management failed")
         return False
 
+def test_enqueue_flags():
+    """Test 8: Enqueue with --id/--command/--max-retries instead of JSON"""
+    print("\n=== Test 8: Enqueue With Flags ===")
+    
+    success, _, stderr = run_command([
+        "enqueue", "--id", "test8", "--command", "echo flags", "--max-retries", "2"
+    ])
+    job = JobStorage().get_job("test8")
+    if not success or not job or job["command"] != "echo flags" or job["max_retries"] != 2:
+        print(f"❌ Flag enqueue failed: {stderr}")
+        return False
+    
+    # JSON and flags together are rejected
+    success, _, stderr = run_command([
+        "enqueue", '{"id":"test8b","command":"echo both"}', "--id", "test8b"
+    ])
+    if success or "not both" not in stderr or JobStorage().get_job("test8b"):
+        print("❌ JSON together with flags was not rejected")
+        return False
+    
+    print("✅ Flag enqueue works and rejects mixed input")
+    return True
+
+def test_batch_enqueue():
+    """Test 9: Batch enqueue from a JSON array"""
+    print("\n=== Test 9: Batch Enqueue ===")
+    
+    success, stdout, stderr = run_command([
+        "enqueue",
+        '[{"id":"test9a","command":"echo a"},{"id":"test9b","command":"echo b"}]'
+    ])
+    storage = JobStorage()
+    if not success or "2 job(s)" not in stdout or not (storage.get_job("test9a") and storage.get_job("test9b")):
+        print(f"❌ Batch enqueue failed: {stderr}")
+        return False
+    
+    # A duplicate ID rejects the whole batch
+    success, _, stderr = run_command([
+        "enqueue",
+        '[{"id":"test9c","command":"echo c"},{"id":"test9a","command":"echo dup"}]'
+    ])
+    if success or storage.get_job("test9c"):
+        print("❌ Batch with a duplicate ID was not rejected as a whole")
+        return False
+    
+    print("✅ Batch enqueue works and is all-or-nothing")
+    return True
+
+def safe_call(test) -> bool:
+    """Run a single test, treating a crash as a failure"""
+    try:
+        return test()
+    except Exception as e:
+        print(f"❌ Test crashed: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("=" * 50)
     print("queuectl Validation Script")
     print("=" * 50)
     
-    tests = [
+    # Independent tests don't touch workers and need no settling time between them
+    independent = [
         test_enqueue,
         test_status,
-        test_worker_completion,
-        test_retry_and_dlq,
         test_persistence,
         test_list_jobs,
         test_config,
+        test_enqueue_flags,
+        test_batch_enqueue,
+    ]
+    serial = [
+        test_worker_completion,
+        test_retry_and_dlq,
     ]
     
-    results = []
-    for test in tests:
-        try:
-            result = test()
-            results.append(result)
-        except Exception as e:
-            print(f"❌ Test crashed: {e}")
-            results.append(False)
+    results = [safe_call(test) for test in independent]
+    for test in serial:
         time.sleep(1)
+        results.append(safe_call(test))
     
     print("\n" + "=" * 50)
     print("Test Results")